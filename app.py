@@ -1,41 +1,79 @@
 ################################################ Libraries
+import time
+
+# Seconds spent in each step of the startup (imports, data, default view, layout), reported by benchmark_startup.py.
+startup_times = {}
+startup_clock = time.perf_counter()
+
+import json
 import os
 import dash
-import dash_core_components as dcc
-import dash_html_components as html
-from dash.dependencies import Input, Output, State
+from dash import dcc, html
+from dash.dependencies import Input, Output, State, ALL
 import dash_daq as daq
 import dash_bootstrap_components as dbc
+from flask import request
 
 import numpy as np
 import pandas as pd
 
 import plotly.graph_objs as go
-import plotly.express as px
+
+import production_store
+from scenarios import stages, stage_matrix, scenario_totals, diet_weights, diet_footprint
+
+
+def startup_step(name):
+    global startup_clock
+    now = time.perf_counter()
+    startup_times[name] = now - startup_clock
+    startup_clock = now
+
+
+startup_step("imports")
 
 ############################################### Paths files
 # Define the directory path where the data files are stored using the os module.
 
 dirname = os.path.dirname(__file__)
 path = os.path.join(dirname, "data/")
+images_path = os.path.join(dirname, "images/")
 
 ################################################ Upload Files 
-# Load the four CSV files containing emissions, production, water use, and global emissions data using the pandas module.
+# Load the CSV files containing emissions, production and EDGAR food system emissions data using the pandas module.
 
 emissions = pd.read_csv(path + "product_origin.csv")
-productions = pd.read_csv(path + "productions.csv")
-water = pd.read_csv(path + "water_use.csv")
-global_emissions = pd.read_csv(path + "Global_Emissions.csv")
 df_edgar_food = pd.read_csv(path + 'EDGARfood.csv')
 
+# The production quantities are kept in a store partitioned by year (see production_store.py). The first start
+# builds it from productions.csv; new FAOSTAT years are added with `python production_store.py <file>` and are
+# shown once gunicorn is stopped and started again.
+if not production_store.exists():
+    production_store.build(pd.read_csv(path + "productions.csv"))
+production_summary = production_store.read_summary()
+
 
 ################################################ Getting the emissions from the products based on its origin
 # Filter the emissions data to get the top 10 products with the highest emissions overall, top 10 products 
 # with the highest emissions from vegetal sources, and top 8 products with the highest emissions from animal sources.
 
-top10 = emissions.sort_values("Total_Emissions")
-top10_vegetal = emissions[emissions.Origin == "Vegetal"].sort_values("Total_Emissions")[-10:]
-top8_animal = emissions[emissions.Origin == "Animal"].sort_values("Total_Emissions")
+def rank_products(df):
+    top10 = df.sort_values("Total_Emissions")
+    top10_vegetal = df[df.Origin == "Vegetal"].sort_values("Total_Emissions")[-10:]
+    top8_animal = df[df.Origin == "Animal"].sort_values("Total_Emissions")
+    return top8_animal, top10_vegetal, top10
+
+
+top8_animal, top10_vegetal, top10 = rank_products(emissions)
+
+################################################ What-if scenarios
+# Products x stages matrix used to recompute the emissions of every product when the stage multipliers change
+# (see scenarios.py). The baseline scenario keeps every stage as it is.
+
+emissions_matrix = stage_matrix(emissions)
+is_animal = (emissions.Origin == "Animal").to_numpy()
+baseline_factors = [1] * len(stages)
+stage_labels = ["Land use", "Animal Feed", "Farm", "Processing", "Transport", "Packaging", "Retail"]
 
 ####################### Head of the filters
 # Create a dbc.RadioItems object with three options (animal, vegetal, and total) for users to select which 
@@ -112,13 +150,286 @@ options_total = [
 
 #Define a list of colors to use for the bars in a later graph.
 bar_colors = ["#ebb36a", "#6dbf9c"]
-bar_options = [top8_animal, top10_vegetal, top10]
 
+#################### Sankey
+edgar_sankey = df_edgar_food.groupby(by=["GHG", "FS Stage Order", "Food System Stage"]).sum()[["GHG Emissions"]]
+edgar_sankey = edgar_sankey.reset_index()
+
+# Define the options for the dropdown
+dropdown_options = [{'label': i, 'value': i} for i in edgar_sankey["GHG"].unique()]
+dropdown_options.append({'label': 'All GHG', 'value': 'All'})
+
+startup_step("data")
+
+########################################################### Dash Callbacks
+# The callback bodies are plain functions so they can also be called at import time to pre-render the default view.
+# They are registered with the app below the layout.
+
+def bar_figure(top10_select, factors):
+    # Kept apart from bar_chart so that moving a scenario slider only redraws the bars and leaves the product
+    # dropdown, and through it the map year and the choropleth, untouched.
+
+    ################## Top10 Plot ##################
+    title = "1. Greenhouse emissions (kg CO2 per kg of product)"
+    if list(factors) != baseline_factors:
+        title += " - what-if scenario"
+    totals = scenario_totals(emissions_matrix, emissions["Total_Emissions"], factors)
+    df = rank_products(emissions.assign(Total_Emissions=totals))[top10_select]
+
+    if top10_select == 2:
+        bar_fig = dict(
+            type="bar",
+            x=df.Total_Emissions,
+            y=df["Food_Product"],
+            orientation="h",
+            marker_color=["#ebb36a" if x == "Animal" else "#6dbf9c" for x in df.Origin],
+        )
+    else:
+        bar_fig = dict(
+            type="bar",
+            x=df.Total_Emissions,
+            y=df["Food_Product"],
+            orientation="h",
+            marker_color=bar_colors[top10_select],
+        )
+
+    return (
+        title,
+        go.Figure(
+            data=bar_fig,
+            layout=dict(
+                height=300,
+                font_color="#363535",
+                paper_bgcolor="rgba(0,0,0,0)",
+                plot_bgcolor="rgba(0,0,0,0)",
+                margin=dict(l=20, r=20, t=30, b=20),
+                margin_pad=10,
+            ),
+        ),
+    )
+
+
+def bar_chart(top10_select):
+
+    ################## Dropdown Bar ##################
+    if top10_select == 0:
+        options_return = options_an
+        product_chosen = "2. Choose an animal product:"
+        comment = [
+            "Each kilogram of beef produces almost 60 kg of CO2!",
+            html.Br(),
+            html.Br(),
+        ]
+    elif top10_select == 1:
+        options_return = options_veg
+        product_chosen = "2. Choose a vegetal product:"
+        comment = [
+            "Did you know that dark chocolate and coffee are the vegetal-based products that emit more gases?",
+            html.Br(),
+            html.Br(),
+        ]
+    else:
+        options_return = options_total
+        product_chosen = "2. Choose an animal or vegetal product:"
+        comment = "Animal sourced food products tend to have higher emissions than food products sourced from plants across all stages of food production (4 of the top 5 in total analyzed products are foods sourced from animals)"
+
+    return (
+        comment,
+        options_return,
+        options_return[0]["value"],
+        product_chosen,
+    )
+
+
+def update_slider(product):
+    year = production_summary["Year"].get(product)
+    return year, year
+
+
+def update_stages(drop_map_value, factors, opt):
+
+    ################## Emissions datset ##################
+
+    the_label = [x["label"] for x in opt if x["value"] == drop_map_value]
+
+    data_emissions = emissions[emissions["Food_Product"] == the_label[0]]
+    stage_values = data_emissions[stages].values[0] * np.asarray(factors, dtype=float)
+
+    # Land use, animal feed, farm, processing, transport, packaging and retail, as shown in the boxes.
+    return tuple(str(np.round(value, 2)) for value in stage_values)
+
+
+def update_diet(shift, factors):
+    totals = scenario_totals(emissions_matrix, emissions["Total_Emissions"], factors)
+    footprint = diet_footprint(totals, diet_weights(is_animal, [0, shift / 100]))
+    return "Average diet footprint: {:.2f} kg CO2 per kg of food ({:+.0%} compared to the current diet)".format(
+        footprint[1], footprint[1] / footprint[0] - 1
+    )
+
+
+def update_map(drop_map_value, year, continent):
+
+    ################## Choroplet Plot ##################
+    title = ""  # Initialize 'title' with an empty string
+    productions = production_store.read_partition(year)
+    prod1 = productions[productions["Item"] == drop_map_value]
+    if not prod1.empty:
+        title = "Production quantities of {}, by country".format(prod1["Item"].unique()[0])
+
+    data_slider = []
+    data_each_yr = dict(
+        type="choropleth",
+        locations=prod1["Area"],
+        locationmode="country names",
+        autocolorscale=False,
+        z=np.log(prod1["Value"].astype(float)),
+        zmin=0,
+        zmax=np.log(production_summary["Value"].get(drop_map_value, np.nan)),
+        colorscale=["#ffe2bd", "#006837"],
+        marker_line_color="rgba(0,0,0,0)",
+        colorbar={"title": "Tonnes (log)"},  # Tonnes in logscale
+        colorbar_lenmode="fraction",
+        colorbar_len=0.8,
+        colorbar_x=1,
+        colorbar_xanchor="left",
+        colorbar_y=0.5,
+        name="",
+        # Add animation settings
+        # animation_frame="Year",
+        # animation_group="Area",
+    )
+    data_slider.append(data_each_yr)
+
+    layout = dict(
+        geo=dict(
+            scope=continent,
+            projection={"type": "natural earth"},
+            bgcolor="rgba(0,0,0,0)",
+        ),
+        margin=dict(l=0, r=0, b=0, t=30, pad=0),
+        paper_bgcolor="rgba(0,0,0,0)",
+        plot_bgcolor="rgba(0,0,0,0)",
+    )
+
+    fig_choropleth = go.Figure(data=data_slider, layout=layout)
+    fig_choropleth.update_geos(
+        showcoastlines=False, showsubunits=False, showframe=False
+    )
+
+    return title, fig_choropleth
+
+def update_sankey_graph(selected_ghg):
+    selected_data = edgar_sankey[edgar_sankey['GHG'] == selected_ghg]
+    if selected_ghg == "All":
+        # Show all data
+        selected_data = edgar_sankey
+    else:
+        # Filter by selected GHG
+        selected_data = edgar_sankey[edgar_sankey['GHG'] == selected_ghg]
+    
+    fig = go.Figure(data=[go.Sankey(
+        arrangement="snap",
+        node=dict(
+            pad=15,
+            thickness=20,
+            line=dict(color="grey", width=0.5),
+            label=[
+                "Carbon dioxide (CO2)", "Methane (CH4)", "Nitrous oxide (N2O)",
+                "F-gases", "Land", "Farm", "Processing",
+                "Transport", "Packaging", "Retail", "Consumer", "Waste"]), 
+            # color=["#3d6493", "#95ceeb", "#308bbc", "#86aad1", "#58805b",
+            #        "#98c7a0", "#f36e3a", "#fba644", "#ad5849", "#d2c795", "#736a62", "#b0a08c"]),
+        link=dict(
+            source=[0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 2, 3],
+            target=[4, 5, 6, 7, 8, 9, 10, 11, 4, 5, 6, 7, 8, 9, 10, 11, 4, 5, 6, 7, 8, 9, 10, 11, 9],
+            value=selected_data['GHG Emissions']
+        )
+    )])
+
+    fig.update_layout(
+        height=580,
+        title= "Years : 1990-2018",
+        font_size=14
+    )
+
+    return fig
+
+################################################### Default view
+# Pre-render what the page shows on load (Total, first product of options_total, its latest year, world scope and
+# All GHG) once per data snapshot, so it ships inside app.layout and the initial callbacks can be suppressed.
+
+default_product = options_total[0]["value"]
+default_year = update_slider(default_product)[0]
+
+default_title_bar, default_bar_fig = bar_figure(2, baseline_factors)
+
+(
+    default_comment,
+    default_drop_options,
+    default_drop_value,
+    default_choose_product,
+) = bar_chart(2)
+
+(
+    default_land_use,
+    default_animal_feed,
+    default_farm,
+    default_processing,
+    default_transport,
+    default_packging,
+    default_retail,
+) = update_stages(default_product, baseline_factors, options_total)
+
+default_title_map, default_map_fig = update_map(default_product, default_year, "world")
+
+default_diet = update_diet(0, baseline_factors)
+
+default_sankey_fig = update_sankey_graph("All")
+
+startup_step("default view")
+
+
+####################### Scenario filters
+# One slider per supply chain stage to scale its emissions, and one to move consumption from animal to vegetal products.
+
+scenario_sliders = html.Div(
+    [
+        html.Div(
+            [
+                html.H4(label, style={"font-weight": "normal"}),
+                dcc.Slider(
+                    id={"type": "stage_factor", "index": stage},
+                    min=0,
+                    max=2,
+                    step=0.1,
+                    value=1,
+                    marks={0: "0%", 1: "100%", 2: "200%"},
+                ),
+            ],
+            style={"width": "14%"},
+        )
+        for stage, label in zip(stages, stage_labels)
+    ],
+    style={"display": "flex"},
+)
+
+slider_diet = dcc.Slider(
+    id="diet_shift",
+    min=0,
+    max=100,
+    step=5,
+    value=0,
+    marks={i: "{}%".format(i) for i in [0, 25, 50, 75, 100]},
+)
+
+####################### Map filters
 # Define a dcc.Dropdown object to be used in a later graph.
 drop_map = dcc.Dropdown(
     id="drop_map",
     clearable=False,
     searchable=False,
+    options=default_drop_options,
+    value=default_drop_value,
     style={"margin": "4px", "box-shadow": "0px 0px #ebb36a", "border-color": "#ebb36a"},
 )
 
@@ -142,26 +453,73 @@ drop_continent = dcc.Dropdown(
 # Define a daq.Slider object for selecting a year to display on a later map, with marks at 1990, 1995, 2000, 2005, 2010, and 2015.
 slider_map = daq.Slider(
     id="slider_map",
+    max=default_year,
+    value=default_year,
     handleLabel={"showCurrentValue": True, "label": "Year"},
     marks={str(i): str(i) for i in [1990, 1995, 2000, 2005, 2010, 2015]},
     min=1990,
     size=450,
     color="#4B9072",
 )
-#################### Sankey
-edgar_sankey = df_edgar_food.groupby(by=["GHG", "FS Stage Order", "Food System Stage"]).sum()[["GHG Emissions"]]
-edgar_sankey = edgar_sankey.reset_index()
+################################################### APP
 
-# Define the options for the dropdown
-dropdown_options = [{'label': i, 'value': i} for i in edgar_sankey["GHG"].unique()]
-dropdown_options.append({'label': 'All GHG', 'value': 'All'})
+class Dashboard(dash.Dash):
+    # The layout never changes once built, so it is serialized for the first request only instead of on every page load.
+    layout_json = None
+
+    def serve_layout(self):
+        if self.layout_json is None:
+            self.layout_json = super().serve_layout().get_data()
+        return self.server.response_class(self.layout_json, mimetype="application/json")
 
-################################################### APP
 
-app = dash.Dash(__name__)
+app = Dashboard(__name__)
 # New Dash application instance.
 server = app.server
 
+################################################### Images
+# The images are served from assets/img/ as content-hashed AVIF/WebP/PNG variants built by build_assets.py,
+# so they can be cached by the browser for good. The manifest lists the variants of each image.
+
+with open(images_path + "manifest.json") as f:
+    image_manifest = json.load(f)
+
+
+def responsive_image(name, style):
+    entry = image_manifest[name]
+
+    def srcset(ext):
+        return ", ".join(
+            "{} {}w".format(app.get_asset_url("img/" + file_name), width)
+            for file_name, width in entry[ext]
+        )
+
+    return html.Picture(
+        [
+            html.Source(type="image/avif", srcSet=srcset("avif"), sizes=entry["sizes"]),
+            html.Source(type="image/webp", srcSet=srcset("webp"), sizes=entry["sizes"]),
+            html.Img(
+                src=app.get_asset_url("img/" + entry["png"][0][0]),
+                srcSet=srcset("png"),
+                sizes=entry["sizes"],
+                style=style,
+            ),
+        ]
+    )
+
+
+# Path the server sees for the images, without the requests_pathname_prefix a proxy may add to the public URLs.
+images_route = "{}{}/img/".format(app.config.routes_pathname_prefix, app.config.assets_url_path.strip("/"))
+
+
+@server.after_request
+def cache_images(response):
+    # Hashed file names never change content, so they are safe to mark as immutable.
+    if response.status_code == 200 and request.path.startswith(images_route):
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+
 app.layout = html.Div(
     [
         html.Div(
@@ -176,8 +534,8 @@ app.layout = html.Div(
                 html.Br(),
                 html.Br(),
                 html.Br(),
-                html.Img(
-                    src=app.get_asset_url("supply_chain.png"),
+                responsive_image(
+                    "supply_chain.png",
                     style={
                         "position": "relative",
                         "width": "180%",
@@ -209,16 +567,34 @@ app.layout = html.Div(
                                 "padding-bottom": "15px",
                             },
                         ),
+                        html.Div(
+                            [
+                                html.Label("What if the emissions of a supply chain stage changed? Scale each stage:"),
+                                html.Br(),
+                                html.Br(),
+                                scenario_sliders,
+                                html.Br(),
+                                html.Label("Share of the animal products replaced by vegetal products in the diet (every product eaten in the same amount):"),
+                                slider_diet,
+                                html.P(default_diet, id="diet_footprint"),
+                            ],
+                            className="box",
+                            style={
+                                "margin": "10px",
+                                "padding-top": "15px",
+                                "padding-bottom": "15px",
+                            },
+                        ),
                         html.Div(
                             [
                                 html.Div(
                                     [
                                         html.Div(
                                             [
-                                                html.Label(id="title_bar"),
-                                                dcc.Graph(id="bar_fig"),
+                                                html.Label(default_title_bar, id="title_bar"),
+                                                dcc.Graph(id="bar_fig", figure=default_bar_fig),
                                                 html.Div(
-                                                    [html.P(id="comment")],
+                                                    [html.P(default_comment, id="comment")],
                                                     className="box_comment",
                                                 ),
                                             ],
@@ -227,8 +603,8 @@ app.layout = html.Div(
                                         ),
                                         html.Div(
                                             [
-                                                html.Img(
-                                                    src=app.get_asset_url("Food.png"),
+                                                responsive_image(
+                                                    "Food.png",
                                                     style={
                                                         "width": "100%",
                                                         "position": "relative",
@@ -245,6 +621,7 @@ app.layout = html.Div(
                                         html.Div(
                                             [
                                                 html.Label(
+                                                    default_choose_product,
                                                     id="choose_product",
                                                     style={"margin": "10px"},
                                                 ),
@@ -275,7 +652,8 @@ app.layout = html.Div(
                                                                             },
                                                                         ),
                                                                         html.H3(
-                                                                            id="land_use"
+                                                                            default_land_use,
+                                                                            id="land_use",
                                                                         ),
                                                                     ],
                                                                     className="box_emissions",
@@ -289,7 +667,8 @@ app.layout = html.Div(
                                                                             },
                                                                         ),
                                                                         html.H3(
-                                                                            id="animal_feed"
+                                                                            default_animal_feed,
+                                                                            id="animal_feed",
                                                                         ),
                                                                     ],
                                                                     className="box_emissions",
@@ -303,7 +682,8 @@ app.layout = html.Div(
                                                                             },
                                                                         ),
                                                                         html.H3(
-                                                                            id="farm"
+                                                                            default_farm,
+                                                                            id="farm",
                                                                         ),
                                                                     ],
                                                                     className="box_emissions",
@@ -317,7 +697,8 @@ app.layout = html.Div(
                                                                             },
                                                                         ),
                                                                         html.H3(
-                                                                            id="processing"
+                                                                            default_processing,
+                                                                            id="processing",
                                                                         ),
                                                                     ],
                                                                     className="box_emissions",
@@ -331,7 +712,8 @@ app.layout = html.Div(
                                                                             },
                                                                         ),
                                                                         html.H3(
-                                                                            id="transport"
+                                                                            default_transport,
+                                                                            id="transport",
                                                                         ),
                                                                     ],
                                                                     className="box_emissions",
@@ -345,7 +727,8 @@ app.layout = html.Div(
                                                                             },
                                                                         ),
                                                                         html.H3(
-                                                                            id="packging"
+                                                                            default_packging,
+                                                                            id="packging",
                                                                         ),
                                                                     ],
                                                                     className="box_emissions",
@@ -359,7 +742,8 @@ app.layout = html.Div(
                                                                             },
                                                                         ),
                                                                         html.H3(
-                                                                            id="retail"
+                                                                            default_retail,
+                                                                            id="retail",
                                                                         ),
                                                                     ],
                                                                     className="box_emissions",
@@ -379,6 +763,7 @@ app.layout = html.Div(
                                                                     [
                                                                         html.Br(),
                                                                         html.Label(
+                                                                            default_title_map,
                                                                             id="title_map",
                                                                             style={
                                                                                 "font-size": "medium"
@@ -417,6 +802,7 @@ app.layout = html.Div(
                                                         ),
                                                         dcc.Graph(
                                                             id="map",
+                                                            figure=default_map_fig,
                                                             style={
                                                                 "position": "relative",
                                                                 "top": "-50px",
@@ -487,7 +873,7 @@ app.layout = html.Div(
                                         ),
                                         html.Br(),
                                         dcc.Graph(id='sankey-graph', 
-                                            figure=go.Figure(), className="box",
+                                            figure=default_sankey_fig, className="box",
                             style={
                                 "margin": "10px",
                                 "padding-top": "15px",
@@ -551,95 +937,34 @@ app.layout = html.Div(
 )
 
 
-########################################################### Dash Callbacks
+########################################################### Callback registration
+# Every output is already filled in by the default view, so the callbacks skip the initial page-load round trips
+# and only fire once the user changes an input.
 
+app.callback(
+    [Output("title_bar", "children"), Output("bar_fig", "figure")],
+    [Input("ani_veg", "value"), Input({"type": "stage_factor", "index": ALL}, "value")],
+    prevent_initial_call=True,
+)(bar_figure)
 
-@app.callback(
+app.callback(
     [
-        Output("title_bar", "children"),
-        Output("bar_fig", "figure"),
         Output("comment", "children"),
         Output("drop_map", "options"),
         Output("drop_map", "value"),
         Output("choose_product", "children"),
     ],
     [Input("ani_veg", "value")],
-)
-def bar_chart(top10_select):
-
-    ################## Top10 Plot ##################
-    title = "1. Greenhouse emissions (kg CO2 per kg of product)"
-    df = bar_options[top10_select]
-
-    if top10_select == 2:
-        bar_fig = dict(
-            type="bar",
-            x=df.Total_Emissions,
-            y=df["Food_Product"],
-            orientation="h",
-            marker_color=["#ebb36a" if x == "Animal" else "#6dbf9c" for x in df.Origin],
-        )
-    else:
-        bar_fig = dict(
-            type="bar",
-            x=df.Total_Emissions,
-            y=df["Food_Product"],
-            orientation="h",
-            marker_color=bar_colors[top10_select],
-        )
-
-    ################## Dropdown Bar ##################
-    if top10_select == 0:
-        options_return = options_an
-        product_chosen = "2. Choose an animal product:"
-        comment = [
-            "Each kilogram of beef produces almost 60 kg of CO2!",
-            html.Br(),
-            html.Br(),
-        ]
-    elif top10_select == 1:
-        options_return = options_veg
-        product_chosen = "2. Choose a vegetal product:"
-        comment = [
-            "Did you know that dark chocolate and coffee are the vegetal-based products that emit more gases?",
-            html.Br(),
-            html.Br(),
-        ]
-    else:
-        options_return = options_total
-        product_chosen = "2. Choose an animal or vegetal product:"
-        comment = "Animal sourced food products tend to have higher emissions than food products sourced from plants across all stages of food production (4 of the top 5 in total analyzed products are foods sourced from animals)"
-
-    return (
-        title,
-        go.Figure(
-            data=bar_fig,
-            layout=dict(
-                height=300,
-                font_color="#363535",
-                paper_bgcolor="rgba(0,0,0,0)",
-                plot_bgcolor="rgba(0,0,0,0)",
-                margin=dict(l=20, r=20, t=30, b=20),
-                margin_pad=10,
-            ),
-        ),
-        comment,
-        options_return,
-        options_return[0]["value"],
-        product_chosen,
-    )
+    prevent_initial_call=True,
+)(bar_chart)
 
-
-@app.callback(
+app.callback(
     [Output("slider_map", "max"), Output("slider_map", "value"),],
     [Input("drop_map", "value")],
-)
-def update_slider(product):
-    year = productions[productions["Item"] == product]["Year"].max()
-    return year, year
-
+    prevent_initial_call=True,
+)(update_slider)
 
-@app.callback(
+app.callback(
     [
         Output("land_use", "children"),
         Output("animal_feed", "children"),
@@ -648,128 +973,35 @@ def update_slider(product):
         Output("transport", "children"),
         Output("packging", "children"),
         Output("retail", "children"),
-        Output("title_map", "children"),
-        Output("map", "figure"),
     ],
+    [Input("drop_map", "value"), Input({"type": "stage_factor", "index": ALL}, "value")],
+    [State("drop_map", "options")],
+    prevent_initial_call=True,
+)(update_stages)
+
+app.callback(
+    Output("diet_footprint", "children"),
+    [Input("diet_shift", "value"), Input({"type": "stage_factor", "index": ALL}, "value")],
+    prevent_initial_call=True,
+)(update_diet)
+
+app.callback(
+    [Output("title_map", "children"), Output("map", "figure")],
     [
         Input("drop_map", "value"),
         Input("slider_map", "value"),
         Input("drop_continent", "value"),
     ],
-    [State("drop_map", "options")],
-)
-def update_map(drop_map_value, year, continent, opt):
-
-    ################## Emissions datset ##################
-
-    the_label = [x["label"] for x in opt if x["value"] == drop_map_value]
-
-    data_emissions = emissions[emissions["Food_Product"] == the_label[0]]
-    land_use_str = str(np.round(data_emissions["Land_Use_Change"].values[0], 2))
-    animal_feed_str = str(np.round(data_emissions["Animal_Feed"].values[0], 2))
-    farm_str = str(np.round(data_emissions["Farm"].values[0], 2))
-    processing_str = str(np.round(data_emissions["Processing"].values[0], 2))
-    transport_str = str(np.round(data_emissions["Transport"].values[0], 2))
-    packging_str = str(np.round(data_emissions["Packaging"].values[0], 2))
-    retail_str = str(np.round(data_emissions["Retail"].values[0], 2))
-
-    ################## Choroplet Plot ##################
-    title = ""  # Initialize 'title' with an empty string
-    prod1 = productions[(productions["Item"] == drop_map_value) & (productions["Year"] == year)]
-    if not prod1.empty:
-        title = "Production quantities of {}, by country".format(prod1["Item"].unique()[0])
-
-    data_slider = []
-    data_each_yr = dict(
-        type="choropleth",
-        locations=prod1["Area"],
-        locationmode="country names",
-        autocolorscale=False,
-        z=np.log(prod1["Value"].astype(float)),
-        zmin=0,
-        zmax=np.log(productions[productions["Item"] == drop_map_value]["Value"].max()),
-        colorscale=["#ffe2bd", "#006837"],
-        marker_line_color="rgba(0,0,0,0)",
-        colorbar={"title": "Tonnes (log)"},  # Tonnes in logscale
-        colorbar_lenmode="fraction",
-        colorbar_len=0.8,
-        colorbar_x=1,
-        colorbar_xanchor="left",
-        colorbar_y=0.5,
-        name="",
-        # Add animation settings
-        # animation_frame="Year",
-        # animation_group="Area",
-    )
-    data_slider.append(data_each_yr)
+    prevent_initial_call=True,
+)(update_map)
 
-    layout = dict(
-        geo=dict(
-            scope=continent,
-            projection={"type": "natural earth"},
-            bgcolor="rgba(0,0,0,0)",
-        ),
-        margin=dict(l=0, r=0, b=0, t=30, pad=0),
-        paper_bgcolor="rgba(0,0,0,0)",
-        plot_bgcolor="rgba(0,0,0,0)",
-    )
-
-    fig_choropleth = go.Figure(data=data_slider, layout=layout)
-    fig_choropleth.update_geos(
-        showcoastlines=False, showsubunits=False, showframe=False
-    )
-
-    return (
-        land_use_str,
-        animal_feed_str,
-        farm_str,
-        processing_str,
-        transport_str,
-        packging_str,
-        retail_str,
-        title,
-        fig_choropleth,
-    )
-
-@app.callback(
+app.callback(
     dash.dependencies.Output('sankey-graph', 'figure'),
-    [dash.dependencies.Input('ghg-dropdown', 'value')]
-)
-def update_sankey_graph(selected_ghg):
-    selected_data = edgar_sankey[edgar_sankey['GHG'] == selected_ghg]
-    if selected_ghg == "All":
-        # Show all data
-        selected_data = edgar_sankey
-    else:
-        # Filter by selected GHG
-        selected_data = edgar_sankey[edgar_sankey['GHG'] == selected_ghg]
-    
-    fig = go.Figure(data=[go.Sankey(
-        arrangement="snap",
-        node=dict(
-            pad=15,
-            thickness=20,
-            line=dict(color="grey", width=0.5),
-            label=[
-                "Carbon dioxide (CO2)", "Methane (CH4)", "Nitrous oxide (N2O)",
-                "F-gases", "Land", "Farm", "Processing",
-                "Transport", "Packaging", "Retail", "Consumer", "Waste"]), 
-            # color=["#3d6493", "#95ceeb", "#308bbc", "#86aad1", "#58805b",
-            #        "#98c7a0", "#f36e3a", "#fba644", "#ad5849", "#d2c795", "#736a62", "#b0a08c"]),
-        link=dict(
-            source=[0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 2, 3],
-            target=[4, 5, 6, 7, 8, 9, 10, 11, 4, 5, 6, 7, 8, 9, 10, 11, 4, 5, 6, 7, 8, 9, 10, 11, 9],
-            value=selected_data['GHG Emissions']
-        )
-    )])
-
-    fig.update_layout(
-        height=580,
-        title= "Years : 1990-2018",
-        font_size=14
-    )
+    [dash.dependencies.Input('ghg-dropdown', 'value')],
+    prevent_initial_call=True,
+)(update_sankey_graph)
 
-    return fig
+startup_step("layout")
 
 if __name__ == "__main__":
     app.run_server(debug=True)
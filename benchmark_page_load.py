@@ -0,0 +1,154 @@
+################################################ Libraries
+import argparse
+import json
+import os
+import sys
+import time
+import warnings
+
+############################################### Page load
+# Replays what the Dash renderer does when the page is opened, against the Flask server of the app: fetch the layout,
+# then fire every callback that is not prevent_initial_call, and every callback whose inputs one of them wrote.
+# Callbacks that do not wait on a pending callback's outputs go out together, as the browser sends them concurrently.
+# Reports the /_dash-layout payload and latency, the number of _dash-update-component requests and of serial round
+# trips, and the server time until the page is complete (the layout plus the slowest request of each round trip).
+#
+#     python benchmark_page_load.py [--app-dir <checkout of another version>]
+
+
+def component_props(layout):
+    # Props of every component of the layout, keyed by the id as Dash writes it in the callbacks.
+    props = {}
+    stack = [layout]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, dict) and "props" in node:
+            if "id" in node["props"]:
+                props[id_key(node["props"]["id"])] = node["props"]
+            stack.extend(value for value in node["props"].values() if isinstance(value, (list, dict)))
+    return props
+
+
+def id_key(component_id):
+    if isinstance(component_id, dict):
+        return json.dumps(component_id, sort_keys=True, separators=(",", ":"))
+    return component_id
+
+
+def matching_ids(pattern, props):
+    # Component ids matched by a callback id, which may use the ALL wildcard.
+    if not pattern.startswith("{"):
+        return [pattern]
+    pattern = json.loads(pattern)
+    matches = []
+    for key in props:
+        if key.startswith("{"):
+            component_id = json.loads(key)
+            if component_id.keys() == pattern.keys() and all(
+                value == ["ALL"] or component_id[name] == value for name, value in pattern.items()
+            ):
+                matches.append(key)
+    return matches
+
+
+def parse_outputs(output):
+    if output.startswith(".."):
+        output = output[2:-2].split("...")
+    else:
+        output = [output]
+    return [tuple(spec.rsplit(".", 1)) for spec in output]
+
+
+def dependency_values(dependencies, props):
+    values = []
+    for dependency in dependencies:
+        entries = [
+            {"id": json.loads(key) if key.startswith("{") else key, "property": dependency["property"],
+             "value": props.get(key, {}).get(dependency["property"])}
+            for key in matching_ids(dependency["id"], props)
+        ]
+        values.append(entries if dependency["id"].startswith("{") else entries[0])
+    return values
+
+
+def inputs_of(callback, props):
+    return {(key, dep["property"]) for dep in callback["inputs"] for key in matching_ids(dep["id"], props)}
+
+
+def page_load(server):
+    client = server.test_client()
+
+    start = time.perf_counter()
+    client.get("/")
+    layout_response = client.get("/_dash-layout")
+    layout_time = time.perf_counter() - start
+    props = component_props(layout_response.get_json())
+
+    callbacks = client.get("/_dash-dependencies").get_json()
+    outputs = [set(parse_outputs(cb["output"])) for cb in callbacks]
+    pending = {i: [] for i, cb in enumerate(callbacks) if not cb.get("prevent_initial_call")}
+
+    requests, round_trips, callbacks_time = 0, 0, layout_time
+    while pending:
+        waiting_on = set().union(*(outputs[i] for i in pending))
+        ready = [i for i in pending if not (inputs_of(callbacks[i], props) & (waiting_on - outputs[i]))] or list(pending)
+
+        slowest, written = 0, set()
+        for i in ready:
+            callback = callbacks[i]
+            specs = parse_outputs(callback["output"])
+            payload = {
+                "output": callback["output"],
+                "outputs": [{"id": key, "property": prop} for key, prop in specs],
+                "inputs": dependency_values(callback["inputs"], props),
+                "state": dependency_values(callback["state"], props),
+                "changedPropIds": ["{}.{}".format(key, prop) for key, prop in pending.pop(i)],
+            }
+            if not callback["output"].startswith(".."):
+                payload["outputs"] = payload["outputs"][0]
+
+            request_start = time.perf_counter()
+            response = client.post("/_dash-update-component", json=payload)
+            slowest = max(slowest, time.perf_counter() - request_start)
+            requests += 1
+            if response.status_code == 200:
+                for key, values in response.get_json()["response"].items():
+                    props.setdefault(key, {}).update(values)
+                    written |= {(key, prop) for prop in values}
+
+        # Every callback reading a written prop fires again, even when the value did not change.
+        for i, callback in enumerate(callbacks):
+            changed = inputs_of(callback, props) & written
+            if changed:
+                pending.setdefault(i, []).extend(changed)
+
+        round_trips += 1
+        callbacks_time += slowest
+
+    return {
+        "layout_bytes": len(layout_response.data),
+        "layout_ms": layout_time * 1000,
+        "requests": requests,
+        "round_trips": round_trips,
+        "complete_ms": callbacks_time * 1000,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the requests and server time of a page load.")
+    parser.add_argument("--app-dir", default=os.path.dirname(os.path.abspath(__file__)), help="folder of app.py")
+    parser.add_argument("--runs", type=int, default=5, help="number of page loads, the median is reported (default: 5)")
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore")
+    os.chdir(args.app_dir)
+    sys.path.insert(0, args.app_dir)
+    import app
+
+    page_load(app.server)  # Warm up: the first requests also load plotly's validators.
+    results = [page_load(app.server) for _ in range(args.runs)]
+    for name in results[0]:
+        values = sorted(r[name] for r in results)
+        print("{:<13} {:>10.1f}".format(name, values[len(values) // 2]))
@@ -0,0 +1,86 @@
+################################################ Libraries
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+############################################### Paths files
+# Start the app in fresh Python processes, report how long each startup step takes and fail when a step goes
+# over its budget. The steps are recorded by app.py in app.startup_times.
+
+dirname = os.path.dirname(os.path.abspath(__file__))
+
+# Budget in seconds for the median of each step; override with --budget step=seconds.
+budgets = {
+    "imports": 2.0,
+    "data": 0.5,
+    "default view": 0.5,
+    "layout": 0.5,
+    "total": 3.0,
+}
+
+measure = """
+import json, time, warnings
+warnings.simplefilter("ignore")
+start = time.perf_counter()
+import app
+times = dict(app.startup_times)
+times["total"] = time.perf_counter() - start
+print(json.dumps(times))
+"""
+
+
+################################################ Benchmark
+def run_once():
+    result = subprocess.run(
+        [sys.executable, "-c", measure], cwd=dirname, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def benchmark(runs, budgets):
+    results = [run_once() for _ in range(runs)]
+    medians = {step: statistics.median(r[step] for r in results) for step in results[0]}
+
+    over_budget = []
+    print("{:<13} {:>10} {:>10} {:>10}".format("step", "median s", "max s", "budget s"))
+    for step, median in medians.items():
+        budget = budgets.get(step)
+        print(
+            "{:<13} {:>10.3f} {:>10.3f} {:>10}".format(
+                step, median, max(r[step] for r in results), "-" if budget is None else budget
+            )
+        )
+        if budget is not None and median > budget:
+            over_budget.append(step)
+
+    return over_budget
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the cold start of the dashboard.")
+    parser.add_argument("--runs", type=int, default=5, help="number of fresh processes to start (default: 5)")
+    parser.add_argument(
+        "--budget",
+        action="append",
+        default=[],
+        metavar="STEP=SECONDS",
+        help="budget for a step ({}), can be repeated".format(", ".join(budgets)),
+    )
+    args = parser.parse_args()
+
+    for budget in args.budget:
+        step, _, seconds = budget.partition("=")
+        if step not in budgets:
+            parser.error("unknown step {!r} in --budget, use one of: {}".format(step, ", ".join(budgets)))
+        try:
+            budgets[step] = float(seconds)
+        except ValueError:
+            parser.error("--budget {} needs a number of seconds".format(budget))
+
+    over_budget = benchmark(args.runs, budgets)
+    if over_budget:
+        sys.exit("Over budget: {}".format(", ".join(over_budget)))
+    print("Within budget")
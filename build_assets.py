@@ -0,0 +1,93 @@
+################################################ Libraries
+import hashlib
+import json
+import os
+from io import BytesIO
+
+from PIL import Image
+
+############################################### Paths files
+# Source images live in images/, outside of the folder Dash serves. The build writes the optimized,
+# content-hashed variants to assets/img/ and a manifest next to the sources that app.py reads to build the srcset.
+
+dirname = os.path.dirname(__file__)
+source_path = os.path.join(dirname, "images/")
+output_path = os.path.join(dirname, "assets/img/")
+manifest_file = os.path.join(source_path, "manifest.json")
+
+################################################ Images used by the layout
+# Widths (in pixels) to render for each image. They cover the rendered size of the image on common screens
+# at 1x and 2x pixel density; widths larger than the source image are skipped.
+
+images = {
+    # Sidebar image: 180% of a 14% wide sidebar, about a quarter of the viewport.
+    "supply_chain.png": {"widths": [320, 480, 960], "sizes": "25vw"},
+    # Illustration below the bar chart: full width of a 40% column.
+    "Food.png": {"widths": [480, 720, 1364], "sizes": "40vw"},
+}
+
+# Output formats, in the order the browser should prefer them. The PNG is the fallback for the <img> tag.
+formats = {
+    "avif": dict(quality=60),
+    "webp": dict(quality=80, method=6),
+    "png": dict(optimize=True),
+}
+
+
+################################################ Build
+def hashed_name(stem, width, ext, content):
+    # Name the file after its own content so it can be cached forever and changes bust the cache.
+    digest = hashlib.sha256(content).hexdigest()[:10]
+    return "{}-{}.{}.{}".format(stem, width, digest, ext)
+
+
+def encode(image, ext):
+    buffer = BytesIO()
+    image.save(buffer, format=ext.upper(), **formats[ext])
+    return buffer.getvalue()
+
+
+def build_image(name, widths):
+    stem = os.path.splitext(name)[0]
+    source = Image.open(source_path + name)
+    entry = {ext: [] for ext in formats}
+
+    for width in sorted(set(min(w, source.width) for w in widths)):
+        height = round(source.height * width / source.width)
+        resized = source.resize((width, height), Image.LANCZOS)
+        for ext in formats:
+            content = encode(resized, ext)
+            file_name = hashed_name(stem, width, ext, content)
+            with open(output_path + file_name, "wb") as f:
+                f.write(content)
+            entry[ext].append([file_name, width])
+
+    return entry
+
+
+def build():
+    os.makedirs(output_path, exist_ok=True)
+    # Start from an empty folder so stale variants are never served.
+    for file_name in os.listdir(output_path):
+        os.remove(output_path + file_name)
+
+    manifest = {}
+    for name, options in images.items():
+        manifest[name] = build_image(name, options["widths"])
+        manifest[name]["sizes"] = options["sizes"]
+
+    with open(manifest_file, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    return manifest
+
+
+if __name__ == "__main__":
+    manifest = build()
+    for name, entry in manifest.items():
+        source_size = os.path.getsize(source_path + name)
+        for ext in formats:
+            for file_name, width in entry[ext]:
+                size = os.path.getsize(output_path + file_name)
+                print("{:<45} {:>5}px {:>8.1f} KB ({:.0%} of source)".format(
+                    file_name, width, size / 1024, size / source_size))
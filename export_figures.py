@@ -0,0 +1,227 @@
+################################################ Libraries
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import plotly.offline
+
+############################################### Paths files
+# Every view of the dashboard is rendered to reports/<view>/... as HTML, JSON and optionally PNG (needs kaleido).
+# The HTML files share reports/plotly.min.js, a local copy of plotly.js that also carries the world topojson the maps
+# are drawn on, so the reports open offline, even from file://. export_manifest.json remembers the inputs and data
+# each file was rendered from, so a run only renders what changed.
+
+dirname = os.path.dirname(__file__)
+path = os.path.join(dirname, "data/")
+default_output = os.path.join(dirname, "reports/")
+# Plotly's topojson files (world_110m.json, europe_110m.json, ...), as found in the dist/topojson folder of plotly.js.
+default_topojson = os.path.join(dirname, "data/topojson/")
+
+app = None
+
+
+################################################ Input space
+def file_hash(*file_names):
+    digest = hashlib.sha256()
+    for file_name in file_names:
+        with open(file_name, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def slug(value):
+    return re.sub(r"[^A-Za-z0-9]+", "_", str(value)).strip("_").lower()
+
+
+def list_tasks():
+    # (kind, inputs, output name, hash of the data the figure is rendered from) for every view.
+    import app as dashboard
+    import production_store
+
+    tasks = []
+
+    origin_hash = file_hash(path + "product_origin.csv")
+    for option in dashboard.radio_ani_veg.options:
+        tasks.append(("bar", (option["value"],), "bar/{}".format(slug(option["label"])), origin_hash))
+
+    edgar_hash = file_hash(path + "EDGARfood.csv")
+    for option in dashboard.dropdown_options:
+        tasks.append(("sankey", (option["value"],), "sankey/{}".format(slug(option["value"])), edgar_hash))
+
+    # Every product of the three dropdowns, for every year it has production data and every continent.
+    products = sorted({x["value"] for x in dashboard.options_an + dashboard.options_veg + dashboard.options_total})
+    # A map only depends on the partition of its year and on the maximum value of the product (the top of the color
+    # scale), so adding a new year leaves the maps of the other years untouched.
+    partitions = production_store.read_partitions()
+    max_values = production_store.read_summary()["Value"]
+    year_hashes = {}
+    for product in products:
+        for year in sorted(partitions[partitions["Item"] == product]["Year"].unique()):
+            if year not in year_hashes:
+                year_hashes[year] = file_hash(production_store.partition_file(year))
+            for continent in dashboard.drop_continent.options:
+                tasks.append(
+                    (
+                        "map",
+                        (product, int(year), continent["value"]),
+                        "map/{}/{}/{}".format(slug(product), year, slug(continent["value"])),
+                        "{}:{!r}".format(year_hashes[year], float(max_values[product])),
+                    )
+                )
+
+    return tasks
+
+
+def task_key(task):
+    kind, inputs, name, data_hash = task
+    return hashlib.sha256(json.dumps([kind, inputs, data_hash]).encode()).hexdigest()
+
+
+################################################ Render
+def load_app():
+    # Run once in each worker process: importing the app loads the data and builds the figures' inputs.
+    global app
+    import app as dashboard
+
+    app = dashboard
+
+
+def topojson_names(scopes):
+    # File names plotly.js looks up for the scopes of the maps, at its default resolution.
+    return ["{}_110m".format(scope.replace(" ", "-")) for scope in scopes]
+
+
+def write_plotlyjs(output, topojson_dir, scopes):
+    # plotly.js uses the topojson found in window.PlotlyGeoAssets before trying to download it from its CDN.
+    # Returns the names of the topojson files that are missing.
+    topojson, missing = {}, []
+    for name in topojson_names(scopes):
+        file_name = os.path.join(topojson_dir, name + ".json")
+        if not os.path.exists(file_name):
+            missing.append(name)
+            continue
+        with open(file_name) as f:
+            topojson[name] = json.load(f)
+
+    with open(os.path.join(output, "plotly.min.js"), "w") as f:
+        f.write("window.PlotlyGeoAssets = {};\n".format(json.dumps({"topojson": topojson})))
+        f.write(plotly.offline.get_plotlyjs())
+
+    return missing
+
+
+def render(task, output, formats):
+    kind, inputs, name, data_hash = task
+
+    if kind == "bar":
+        fig = app.bar_figure(inputs[0], app.baseline_factors)[1]
+    elif kind == "sankey":
+        fig = app.update_sankey_graph(inputs[0])
+    else:
+        fig = app.update_map(*inputs)[1]
+
+    file_name = os.path.join(output, name)
+    os.makedirs(os.path.dirname(file_name), exist_ok=True)
+    if "html" in formats:
+        # Point to the copy of plotly.js at the root of the output folder.
+        plotlyjs = os.path.relpath(os.path.join(output, "plotly.min.js"), os.path.dirname(file_name))
+        fig.write_html(file_name + ".html", include_plotlyjs=plotlyjs, full_html=True)
+    if "json" in formats:
+        with open(file_name + ".json", "w") as f:
+            f.write(fig.to_json())
+    if "png" in formats:
+        fig.write_image(file_name + ".png")
+
+    return name
+
+
+def export(output=default_output, formats=("html", "json"), workers=None, force=False, topojson_dir=default_topojson):
+    if "png" in formats:
+        try:
+            import kaleido  # noqa: F401
+        except ImportError:
+            raise SystemExit("PNG export needs kaleido: pip install kaleido")
+
+    start = time.perf_counter()
+    os.makedirs(output, exist_ok=True)
+    manifest_file = os.path.join(output, "export_manifest.json")
+    manifest = {}
+    if os.path.exists(manifest_file) and not force:
+        with open(manifest_file) as f:
+            manifest = json.load(f)
+
+    tasks = list_tasks()
+    task_formats = {task[2]: tuple(formats) for task in tasks}
+    if "html" in formats:
+        missing = write_plotlyjs(output, topojson_dir, sorted({task[1][2] for task in tasks if task[0] == "map"}))
+        if missing:
+            # Without the topojson an HTML map would need the plotly CDN, so only the other formats of the maps
+            # are written. They are rendered again as HTML once the files are there, as their formats change.
+            print(
+                "Warning: skipping the HTML maps, plotly's topojson files are missing in {}: {}. Copy them from "
+                "the dist/topojson folder of plotly.js, or pass --topojson-dir.".format(topojson_dir, ", ".join(missing))
+            )
+            for task in tasks:
+                if task[0] == "map":
+                    task_formats[task[2]] = tuple(ext for ext in formats if ext != "html")
+            tasks = [task for task in tasks if task_formats[task[2]]]
+
+    # A file is up to date when it was rendered from the same inputs, data and formats, and is still there.
+    keys = {task[2]: task_key(task) + ":" + ",".join(sorted(task_formats[task[2]])) for task in tasks}
+    todo = [
+        task
+        for task in tasks
+        if manifest.get(task[2]) != keys[task[2]]
+        or not all(os.path.exists(os.path.join(output, task[2] + "." + ext)) for ext in task_formats[task[2]])
+    ]
+    print("{} figures, {} up to date, {} to render".format(len(tasks), len(tasks) - len(todo), len(todo)))
+
+    render_start = time.perf_counter()
+    done = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=load_app) as executor:
+            futures = [executor.submit(render, task, output, task_formats[task[2]]) for task in todo]
+            for future in as_completed(futures):
+                name = future.result()
+                manifest[name] = keys[name]
+                done += 1
+                if done % 100 == 0 or done == len(todo):
+                    print("  {}/{} rendered".format(done, len(todo)))
+    finally:
+        # Keep what was rendered so an interrupted run resumes where it stopped.
+        with open(manifest_file, "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+
+    render_time = time.perf_counter() - render_start
+    print(
+        "Rendered {} figures in {:.1f} s ({:.1f} figures/s with {} workers), skipped {}, total {:.1f} s".format(
+            done,
+            render_time,
+            done / render_time if render_time else 0,
+            workers or os.cpu_count(),
+            len(tasks) - len(todo),
+            time.perf_counter() - start,
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export every view of the dashboard to static files.")
+    parser.add_argument("--output", default=default_output, help="output folder (default: reports/)")
+    parser.add_argument(
+        "--formats",
+        default="html,json",
+        help="comma separated list of html, json and png (png needs kaleido)",
+    )
+    parser.add_argument("--workers", type=int, default=None, help="number of processes (default: all cores)")
+    parser.add_argument("--force", action="store_true", help="render every figure, even the unchanged ones")
+    parser.add_argument(
+        "--topojson-dir", default=default_topojson, help="folder with plotly's topojson files (default: data/topojson/)"
+    )
+    args = parser.parse_args()
+
+    export(args.output, tuple(args.formats.split(",")), args.workers, args.force, args.topojson_dir)
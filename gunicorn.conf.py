@@ -0,0 +1,5 @@
+# Gunicorn settings, read automatically when gunicorn is started from this folder (gunicorn app:server).
+
+# Import the app (data, default view and layout) once in the master process; the workers are forked from it
+# and start serving right away instead of each building everything again.
+preload_app = True
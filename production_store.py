@@ -0,0 +1,122 @@
+################################################ Libraries
+import os
+import shutil
+import sys
+import tempfile
+from functools import lru_cache
+
+import pandas as pd
+
+############################################### Paths files
+# The FAOSTAT production quantities are stored as one CSV file per year in data/productions/, next to two small
+# summary files:
+#   partitions.csv  per partition (year): Item, Year and the maximum Value of the item in that year
+#   items.csv       per item: the latest Year with data and the maximum Value over all years
+# Adding a year only reads the new rows and merges their summary, so its cost does not grow with the history.
+# A running app keeps the summaries, partitions and default view it has read: stop and start gunicorn after adding a
+# year. A HUP is not enough, because with preload_app (gunicorn.conf.py) the new workers fork from the same master.
+
+dirname = os.path.dirname(__file__)
+store_path = os.path.join(dirname, "data/productions/")
+
+summary_columns = ["Item", "Year", "Value"]
+
+
+def partition_file(year, path=store_path):
+    return os.path.join(path, "{}.csv".format(int(year)))
+
+
+def exists(path=store_path):
+    return os.path.exists(os.path.join(path, "items.csv"))
+
+
+################################################ Ingest
+def summarize(df):
+    # Latest year and maximum value of each item.
+    return df.groupby("Item").agg(Year=("Year", "max"), Value=("Value", "max")).reset_index()
+
+
+def ingest(df, path=store_path):
+    # Write each year of df as a partition (replacing it if it already exists) and merge the summaries.
+    if df.empty:
+        return None
+
+    os.makedirs(path, exist_ok=True)
+    partitions_file = os.path.join(path, "partitions.csv")
+    items_file = os.path.join(path, "items.csv")
+
+    years = sorted(df["Year"].unique())
+    new_partitions = pd.concat([summarize(df[df["Year"] == year]) for year in years])[summary_columns]
+    for year in years:
+        df[df["Year"] == year].to_csv(partition_file(year, path), index=False)
+    read_partition.cache_clear()
+
+    if not os.path.exists(partitions_file):
+        new_partitions.to_csv(partitions_file, index=False)
+        items = summarize(new_partitions)
+    else:
+        partitions = pd.read_csv(partitions_file)
+        if partitions["Year"].isin(years).any():
+            # A year was published again: drop its old summary and merge the summaries of every partition, which
+            # is still one row per item and year and never needs the partitions themselves.
+            partitions = pd.concat([partitions[~partitions["Year"].isin(years)], new_partitions])
+            partitions.to_csv(partitions_file, index=False)
+            items = summarize(partitions)
+        else:
+            new_partitions.to_csv(partitions_file, mode="a", header=False, index=False)
+            items = summarize(pd.concat([pd.read_csv(items_file), new_partitions]))
+
+    items[summary_columns].to_csv(items_file, index=False)
+    return items
+
+
+def build(df, path=store_path):
+    # Build a new store in a temporary folder next to it and move it in place with one rename, so processes
+    # starting at the same time never read or write a half built store. The first one to finish wins.
+    parent = os.path.dirname(os.path.normpath(path))
+    os.makedirs(parent, exist_ok=True)
+    build_path = tempfile.mkdtemp(prefix=".productions-", dir=parent)
+    ingest(df, build_path)
+    try:
+        os.rename(build_path, os.path.normpath(path))
+    except OSError:
+        # Another process built the store first.
+        shutil.rmtree(build_path)
+
+
+################################################ Read
+@lru_cache(maxsize=None)
+def read_partition(year, path=store_path):
+    # Production quantities of every item and country in a year (empty when the year is not stored).
+    if year is None or not os.path.exists(partition_file(year, path)):
+        return pd.DataFrame(columns=["Area", "Item", "Year", "Value"])
+    return pd.read_csv(partition_file(year, path))
+
+
+def read_partitions(path=store_path):
+    # Years stored for each item, with the maximum value of the item in that year.
+    return pd.read_csv(os.path.join(path, "partitions.csv"))
+
+
+def read_summary(path=store_path):
+    # Latest year and maximum value of each item, indexed by item.
+    return pd.read_csv(os.path.join(path, "items.csv"), index_col="Item")
+
+
+if __name__ == "__main__":
+    # python production_store.py <FAOSTAT csv> [...]: add the years of each file to the store.
+    if not exists():
+        # Start from the full history, as the app does on its first start, so the new years are added to it.
+        history_file = os.path.join(dirname, "data/productions.csv")
+        if not os.path.exists(history_file):
+            sys.exit("No production store and no {} to build it from.".format(history_file))
+        build(pd.read_csv(history_file))
+        print("Built the store from {}".format(history_file))
+
+    for file_name in sys.argv[1:]:
+        new_data = pd.read_csv(file_name)
+        if new_data.empty:
+            print("{}: no rows, skipped".format(file_name))
+            continue
+        ingest(new_data)
+        print("{}: {} rows, years {}".format(file_name, len(new_data), ", ".join(map(str, sorted(new_data["Year"].unique())))))
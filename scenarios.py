@@ -0,0 +1,92 @@
+################################################ Libraries
+import os
+import time
+
+import numpy as np
+
+################################################ Supply chain stages
+# Stage columns of product_origin.csv, in the order used by the scenario vectors.
+
+stages = [
+    "Land_Use_Change",
+    "Animal_Feed",
+    "Farm",
+    "Processing",
+    "Transport",
+    "Packaging",
+    "Retail",
+]
+
+################################################ What-if scenarios
+# A scenario is a vector of multipliers, one per stage (1 keeps a stage as it is, 0.5 halves it). A batch of
+# scenarios is a (scenarios x stages) array, so whole sensitivity sweeps are evaluated with one matrix product.
+
+
+def stage_matrix(emissions):
+    # Products x stages matrix of emissions (kg CO2 per kg of product).
+    return emissions[stages].to_numpy(dtype=float)
+
+
+def scenario_totals(matrix, totals, factors):
+    # New total emissions per product. Only the change in each stage is added to the published totals, so the
+    # baseline scenario gives back Total_Emissions exactly even where the stages do not add up to it. Where the
+    # stages add up to more (e.g. Nuts, whose total includes a negative land use change that the stage columns
+    # leave out), removing a stage could go below zero, so the totals are clipped at 0 like the stage values.
+    factors = np.asarray(factors, dtype=float)
+    return np.maximum(np.asarray(totals, dtype=float) + (factors - 1) @ matrix.T, 0)
+
+
+def scenario_ranking(totals):
+    # Product indices from the highest to the lowest emitter, for each scenario.
+    return np.argsort(-np.asarray(totals), axis=-1, kind="stable")
+
+
+def scenario_grid(levels):
+    # Every combination of the given multipliers over the seven stages, as a (len(levels) ** 7 x stages) array.
+    grid = np.meshgrid(*[np.asarray(levels, dtype=float)] * len(stages), indexing="ij")
+    return np.stack(grid, axis=-1).reshape(-1, len(stages))
+
+
+################################################ Diet shift
+# A diet shift moves a share of the consumption of animal products to vegetal products, spread over the vegetal
+# products in proportion to their current consumption. Without consumption data every product weighs the same.
+
+
+def diet_weights(is_animal, shift, consumption=None):
+    is_animal = np.asarray(is_animal, dtype=bool)
+    consumption = np.ones(is_animal.shape) if consumption is None else np.asarray(consumption, dtype=float)
+    shift = np.asarray(shift, dtype=float)[..., np.newaxis]
+
+    animal = np.where(is_animal, consumption, 0)
+    vegetal = consumption - animal
+    moved = shift * animal.sum()
+    return animal * (1 - shift) + vegetal * (1 + moved / vegetal.sum())
+
+
+def diet_footprint(totals, weights):
+    # Average emissions per kg of food eaten, for each scenario.
+    return (np.asarray(totals) * weights).sum(axis=-1) / weights.sum(axis=-1)
+
+
+if __name__ == "__main__":
+    # python scenarios.py: check the engine on product_origin.csv and time a full sensitivity sweep.
+    import pandas as pd
+
+    emissions = pd.read_csv(os.path.join(os.path.dirname(__file__), "data/product_origin.csv"))
+    matrix = stage_matrix(emissions)
+    totals = emissions["Total_Emissions"].to_numpy()
+
+    assert np.array_equal(scenario_totals(matrix, totals, np.ones(len(stages))), totals), "baseline differs"
+    assert np.allclose(scenario_totals(matrix, totals, np.zeros(len(stages))), 0), "removing every stage leaves emissions"
+    for stage in range(len(stages)):
+        factors = np.ones(len(stages))
+        factors[stage] = 0
+        assert (scenario_totals(matrix, totals, factors) >= 0).all(), "negative total without " + stages[stage]
+
+    start = time.perf_counter()
+    grid = scenario_grid([0, 0.5, 1, 1.5, 2])
+    sweep = scenario_totals(matrix, totals, grid)
+    scenario_ranking(sweep)
+    assert (sweep >= 0).all(), "negative total in the sweep"
+    print("{} scenarios x {} products totalled and ranked in {:.3f} s".format(
+        len(grid), len(totals), time.perf_counter() - start))